@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the per-request payment brand resolution and form rendering.
+
+Compares the previous path (raw settings string, unfiltered) with the
+precomputed BrandRegistry (filtered by currency, amount and country).
+
+Usage: python benchmarks/bench_brands.py [iterations]
+"""
+from __future__ import print_function, unicode_literals
+
+import os
+import sys
+import timeit
+from decimal import Decimal as D
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure(
+    INSTALLED_APPS=['oscar_opp'],
+    TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'APP_DIRS': True,
+    }],
+    OPP_PAYMENT_METHODS={
+        'opp_card': 'VISA MASTER AMEX DINERS JCB MAESTRO',
+        'opp_bank': 'EPS GIROPAY IDEAL SOFORTUEBERWEISUNG DIRECTDEBIT_SEPA',
+    },
+    OPP_DEFAULT_PAYMENT_METHOD='opp_card',
+    OPP_PAYMENT_BRAND_LIMITS={'AMEX': {'max_amount': '2500'}},
+)
+django.setup()
+
+from django.template.loader import get_template  # noqa: E402
+
+from oscar_opp.copyandpay.brands import get_registry  # noqa: E402
+
+template = get_template('oscar_opp/form.html')
+ctx = {
+    'checkout_id': '2E04FECDB36CC98BA8C79B4AC348BA59.sbg-vm-tx02',
+    'locale': 'en',
+    'shopper_result_url': 'https://example.com/checkout/callback/',
+    'gateway_host': 'https://test.oppwa.com/v1/',
+}
+
+
+def legacy():
+    brands = settings.OPP_PAYMENT_METHODS.get('opp_card')
+    return template.render(dict(ctx, payment_method=brands))
+
+
+def registry():
+    registry = get_registry()
+    brands = registry.filter(
+        'opp_card', currency='EUR', amount=D('99.90'), country='AT',
+    )
+    config = registry.widget_config(brands)
+    return template.render(dict(
+        ctx,
+        payment_method=config['payment_brands'],
+        custom_brands_html=config['custom_brands_html'],
+    ))
+
+
+def resolve_only():
+    registry = get_registry()
+    brands = registry.filter(
+        'opp_bank', currency='EUR', amount=D('99.90'), country='AT',
+    )
+    return registry.widget_config(brands)
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    for func in (legacy, registry, resolve_only):
+        func()
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print('%-14s %8.2f us/call' % (func.__name__, seconds / number * 1e6))
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark payment page time-to-render with and without prefetched checkouts.
+
+OPP is replaced by a local mock answering after a fixed latency.
+
+Usage: python benchmarks/bench_prefetch.py [iterations] [latency_ms]
+"""
+from __future__ import print_function, unicode_literals
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal as D
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure(
+    INSTALLED_APPS=['oscar_opp'],
+    DATABASES={'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(tempfile.mkdtemp(), 'bench.sqlite3'),
+    }},
+    TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'APP_DIRS': True,
+    }],
+    USE_TZ=True,
+    OPP_PREFETCH_CHECKOUTS=True,
+)
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+
+from oscar_opp.copyandpay.facade import Facade  # noqa: E402
+from oscar_opp.copyandpay.gateway import Gateway  # noqa: E402
+from oscar_opp.copyandpay.prefetch import prefetch_checkout  # noqa: E402
+
+LATENCY = int(sys.argv[2]) / 1000.0 if len(sys.argv) > 2 else 0.3
+
+
+class MockRequest(object):
+    body = 'authentication.userId=XXXXXX&amount=10.00&currency=EUR'
+
+
+class MockResponse(object):
+    ok = True
+    status_code = 200
+    request = MockRequest()
+
+    def __init__(self, data):
+        self.content = json.dumps(data).encode('utf-8')
+        self.elapsed = timedelta(seconds=LATENCY)
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+
+def get_checkout_id(self, **kwargs):
+    time.sleep(LATENCY)
+    return MockResponse({
+        'id': 'checkout-%s' % kwargs['merchant_invoice_id'],
+        'result': {'code': '000.200.100', 'description': ''},
+    })
+
+
+Gateway.get_checkout_id = get_checkout_id
+
+
+def render_payment_page(invoice_id):
+    facade = Facade()
+    facade.prepare_checkout(
+        D('99.90'), 'EUR', merchant_invoice_id=invoice_id,
+    )
+    return facade.get_form(callback='/checkout/callback/', locale='en')
+
+
+def measure(prefetch, number):
+    timings = []
+    for i in range(number):
+        invoice_id = '%s-%d' % ('prefetch' if prefetch else 'sync', i)
+        if prefetch:
+            # the basket total is known before the payment page is requested
+            prefetch_checkout(
+                D('99.90'), 'EUR', merchant_invoice_id=invoice_id,
+            ).result()
+        start = time.time()
+        render_payment_page(invoice_id)
+        timings.append(time.time() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[-1]
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    call_command('migrate', verbosity=0)
+    for prefetch in (False, True):
+        median, worst = measure(prefetch, number)
+        print('%-12s median %8.2f ms  max %8.2f ms' % (
+            'prefetch' if prefetch else 'synchronous',
+            median * 1000, worst * 1000,
+        ))
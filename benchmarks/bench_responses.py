@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark parsing of large payment status responses.
+
+Compares keeping the dict parsed with stdlib json (previous facade
+behaviour) with the slotted PaymentStatusResponse, using stdlib json and,
+if installed, orjson, in throughput and retained memory.
+
+Usage: python benchmarks/bench_responses.py [iterations]
+"""
+from __future__ import print_function, unicode_literals
+
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from oscar_opp.copyandpay import responses  # noqa: E402
+from oscar_opp.copyandpay.responses import PaymentStatusResponse  # noqa: E402
+
+CONTENT = json.dumps({
+    'id': '8a82944a4cc25ebf014cc2c782423202',
+    'paymentType': 'DB',
+    'paymentBrand': 'VISA',
+    'amount': '92.00',
+    'currency': 'EUR',
+    'descriptor': '4422.1234.5678 OPP_Channel',
+    'merchantTransactionId': '100001',
+    'merchantInvoiceId': '100001',
+    'result': {
+        'code': '000.100.110',
+        'description': "Request successfully processed in "
+                       "'Merchant in Integrator Test Mode'",
+    },
+    'resultDetails': {
+        'ExtendedDescription': 'Approved',
+        'ConnectorTxID1': '8a82944a4cc25ebf014cc2c782423202',
+        'AcquirerResponse': '00',
+    },
+    'card': {
+        'bin': '420000', 'last4Digits': '0000', 'holder': 'Jane Jones',
+        'expiryMonth': '05', 'expiryYear': '2034',
+    },
+    'customer': {
+        'givenName': 'Jane', 'surname': 'Jones', 'email': 'jane@example.com',
+        'ip': '192.168.0.1', 'browserFingerprint': {'value': 'x' * 512},
+    },
+    'billing': {
+        'street1': 'Main Street 1', 'city': 'Vienna', 'postcode': '1010',
+        'country': 'AT',
+    },
+    'threeDSecure': {
+        'eci': '05', 'verificationId': 'AAACAgSRBklmQCFgMpEGAAAAAAA=',
+        'xid': 'CAACCVVUlwCXUyhQNlSXAAAAAAA=', 'paRes': 'x' * 4096,
+        'version': '2.1.0', 'dsTransactionId': 'f25084f0-5b16-4c0a',
+    },
+    'risk': {
+        'score': '0',
+        'rules': [{'id': i, 'result': 'PASS'} for i in range(50)],
+    },
+    'cart': {
+        'items': [
+            {'name': 'Item %d' % i, 'quantity': '1', 'price': '4.60'}
+            for i in range(20)
+        ],
+    },
+    'customParameters': {'SHOPPER_%d' % i: 'value' for i in range(20)},
+    'timestamp': '2026-10-19 12:00:00+0000',
+    'ndc': '8a8294174b7ecb28014b9699220015ca_2f2b2c1a',
+}).encode('utf-8')
+
+
+def parse_dict():
+    data = json.loads(CONTENT.decode('utf-8'))
+    result = data.get('result', {})
+    return data, result.get('code'), result.get('description')
+
+
+def parse_slots():
+    return PaymentStatusResponse(200, CONTENT)
+
+
+def retained(func, number):
+    tracemalloc.start()
+    kept = [func() for __ in range(number)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print('payload %d bytes' % len(CONTENT))
+    orjson = responses.orjson
+    runs = [('parse_dict[json]', parse_dict, None),
+            ('parse_slots[json]', parse_slots, None)]
+    if orjson is not None:
+        runs.append(('parse_slots[orjson]', parse_slots, orjson))
+    else:
+        print('orjson not installed, pip install django-oscar-opp[orjson]')
+    for name, func, backend in runs:
+        responses.orjson = backend
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        size = retained(func, 1000)
+        print('%-20s %8.2f us/call  %8.1f KiB retained per 1000' % (
+            name, seconds / number * 1e6, size / 1024.0))
+    responses.orjson = orjson
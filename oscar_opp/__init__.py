@@ -0,0 +1 @@
+default_app_config = 'oscar_opp.apps.OscarOppConfig'
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.apps import AppConfig
+
+
+class OscarOppConfig(AppConfig):
+    name = 'oscar_opp'
+    verbose_name = 'Open Payment Platform'
+
+    def ready(self):
+        from . import checks  # noqa
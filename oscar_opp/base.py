@@ -15,7 +15,8 @@ class ResponseModel(models.Model):
 
     response_time = models.FloatField(help_text=_("Response time in milliseconds"))
 
-    date_created = models.DateTimeField(_('Created'), auto_now_add=True)
+    date_created = models.DateTimeField(
+        _('Created'), auto_now_add=True, db_index=True)
     date_updated = models.DateTimeField(_('Last modified'), auto_now=True)
 
     class Meta:
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+
+
+@checks.register()
+def check_payment_brands(app_configs, **kwargs):
+    """
+    Validate OPP_PAYMENT_METHODS on startup instead of on the payment page.
+    """
+    from .copyandpay.brands import get_registry
+
+    try:
+        registry = get_registry()
+    except (ImproperlyConfigured, AttributeError, ValueError) as e:
+        return [checks.Error(
+            "Invalid OPP payment brand configuration: %s" % e,
+            id='oscar_opp.E001',
+        )]
+    return [
+        checks.Warning(
+            "Unknown OPP payment brand %s is used without restrictions." % name,
+            hint="Define it in OPP_PAYMENT_BRAND_LIMITS.",
+            id='oscar_opp.W001',
+        )
+        for name in sorted(registry.unknown_brands)
+    ]
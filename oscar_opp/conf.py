@@ -21,3 +21,40 @@ class OpenPasswordPlatformConf(AppConf):
         'opp_eps': 'EPS',
     }
     DEFAULT_PAYMENT_METHOD = 'opp_card'
+    # dictionary of payment-brand: restrictions, overriding the defaults in
+    # oscar_opp.copyandpay.brands.KNOWN_BRANDS, eg.
+    # {'AMEX': {'currencies': ['EUR', 'USD'], 'max_amount': '5000.00'}}
+    PAYMENT_BRAND_LIMITS = {}
+    # only look up transactions by checkout id created within this many days,
+    # None to search all; lets partitioned tables skip old partitions
+    TRANSACTION_LOOKUP_DAYS = None
+    # database aliases used by oscar_opp.routers.ReplicaRouter and the
+    # primary()/replica() querysets
+    PRIMARY_DATABASE = 'default'
+    REPLICA_DATABASES = []
+    # reuse pending checkouts prepared in advance (see
+    # oscar_opp.copyandpay.prefetch) instead of preparing them synchronously
+    PREFETCH_CHECKOUTS = False
+    # seconds a prepared checkout is reused, older ones are stale and get
+    # replaced; OPP expires checkouts after 30 minutes
+    CHECKOUT_TTL = 20 * 60
+    # number of background threads preparing checkouts
+    PREFETCH_WORKERS = 2
+    # number of prefetches waiting for a thread, more are skipped
+    PREFETCH_QUEUE_SIZE = 10
+    # token bucket per client: (requests, seconds), None to disable
+    RATE_LIMIT = (10, 60)
+    # cache alias storing the token buckets, None to keep them in memory
+    RATE_LIMIT_CACHE = 'default'
+    # request.META key holding the client IP address to limit per address,
+    # eg. 'REMOTE_ADDR' or the header set by your proxy; None to not limit
+    # per address
+    RATE_LIMIT_IP_HEADER = None
+    # maximum number of concurrent requests to OPP per process, None for no
+    # limit; further requests fail immediately instead of queuing
+    MAX_CONCURRENT_REQUESTS = None
+    # seconds to wait for OPP to connect and respond
+    REQUEST_TIMEOUT = 30
+
+    class Meta:
+        prefix = 'opp'
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+from collections import namedtuple
+from decimal import Decimal as D, InvalidOperation
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from ..conf import settings
+
+# brand kinds
+CARD = 'card'
+BANK = 'bank'
+VIRTUAL = 'virtual'
+
+
+class Brand(namedtuple('Brand', [
+    'name', 'kind', 'currencies', 'countries', 'min_amount', 'max_amount',
+])):
+    """
+    A payment brand as understood by the COPYandPAY widget.
+
+    `currencies` and `countries` are frozensets or None (= no restriction),
+    `min_amount` and `max_amount` are Decimals or None.
+    """
+    __slots__ = ()
+
+    def accepts_amount(self, amount):
+        if self.min_amount is not None and amount < self.min_amount:
+            return False
+        if self.max_amount is not None and amount > self.max_amount:
+            return False
+        return True
+
+
+# payment brands known to OPP, with their default restrictions
+# https://docs.oppwa.com/reference/parameters#brands
+KNOWN_BRANDS = {
+    'AMEX': (CARD, None, None),
+    'CARTEBANCAIRE': (CARD, None, ('FR',)),
+    'DANKORT': (CARD, ('DKK',), ('DK',)),
+    'DINERS': (CARD, None, None),
+    'DISCOVER': (CARD, None, None),
+    'JCB': (CARD, None, None),
+    'MAESTRO': (CARD, None, None),
+    'MASTER': (CARD, None, None),
+    'UNIONPAY': (CARD, None, None),
+    'VISA': (CARD, None, None),
+    'VISAELECTRON': (CARD, None, None),
+    'VPAY': (CARD, None, None),
+    'DIRECTDEBIT_SEPA': (BANK, ('EUR',), None),
+    'EPS': (BANK, ('EUR',), ('AT',)),
+    'GIROPAY': (BANK, ('EUR',), ('DE',)),
+    'IDEAL': (BANK, ('EUR',), ('NL',)),
+    'PREPAYMENT': (BANK, None, None),
+    'SOFORTUEBERWEISUNG': (
+        BANK, ('EUR', 'CHF', 'GBP', 'PLN'),
+        ('AT', 'BE', 'CH', 'DE', 'ES', 'FR', 'GB', 'IT', 'NL', 'PL'),
+    ),
+    'APPLEPAY': (VIRTUAL, None, None),
+    'GOOGLEPAY': (VIRTUAL, None, None),
+    'KLARNA_INSTALLMENTS': (VIRTUAL, None, None),
+    'KLARNA_INVOICE': (VIRTUAL, None, None),
+    'PAYDIREKT': (VIRTUAL, ('EUR',), ('DE',)),
+    'PAYPAL': (VIRTUAL, None, None),
+}
+
+
+def _frozenset(values):
+    if values is None:
+        return None
+    if not isinstance(values, (list, tuple, set, frozenset)):
+        # a plain string would be split into its characters
+        raise TypeError("expected a list of codes, got %r" % (values,))
+    return frozenset(value.upper() for value in values)
+
+
+def _decimal(value):
+    if value is None:
+        return None
+    try:
+        return D(str(value))
+    except InvalidOperation:
+        raise ValueError("expected an amount, got %r" % (value,))
+
+
+def _split(brands):
+    if isinstance(brands, (list, tuple)):
+        return tuple(brands)
+    return tuple(brands.split())
+
+
+class BrandRegistry(object):
+    def __init__(self, payment_methods, default_method=None, limits=None):
+        """
+        Parse and validate the configured payment methods once.
+
+        :param payment_methods: dict of payment-method: payment-brands, the
+            brands given as space-separated string or sequence of names
+        :param default_method: payment method used if none is requested
+        :param limits: dict of brand: dict overriding `kind`, `currencies`,
+            `countries`, `min_amount` and/or `max_amount` of known brands,
+            or defining additional brands
+        """
+        limits = limits or {}
+
+        self.brands = {}
+        for name in set(KNOWN_BRANDS) | set(limits):
+            kind, currencies, countries = KNOWN_BRANDS.get(
+                name, (VIRTUAL, None, None))
+            options = limits.get(name, {})
+            try:
+                self.brands[name] = Brand(
+                    name=name,
+                    kind=options.get('kind', kind),
+                    currencies=_frozenset(
+                        options.get('currencies', currencies)),
+                    countries=_frozenset(options.get('countries', countries)),
+                    min_amount=_decimal(options.get('min_amount')),
+                    max_amount=_decimal(options.get('max_amount')),
+                )
+            except (AttributeError, TypeError, ValueError) as e:
+                raise ImproperlyConfigured(
+                    "Invalid OPP payment brand limits of %s: %s" % (name, e)
+                )
+
+        # configured brands neither known nor defined in limits
+        self.unknown_brands = set()
+
+        self.methods = {}
+        for method, brands in payment_methods.items():
+            names = _split(brands)
+            for name in names:
+                if name not in self.brands:
+                    # unrestricted, so new OPP brands keep working
+                    self.unknown_brands.add(name)
+                    self.brands[name] = Brand(
+                        name, VIRTUAL, None, None, None, None)
+            self.methods[method] = tuple(self.brands[name] for name in names)
+
+        if default_method and default_method not in self.methods:
+            raise ImproperlyConfigured(
+                "Default OPP payment method %s is not configured"
+                % default_method
+            )
+        self.default_method = default_method
+
+        # (method, currency, country): brands, filled on first lookup
+        self._candidates = {}
+        # brands: widget config, filled on first lookup
+        self._widget_configs = {}
+
+    def get_brands(self, payment_method=None):
+        """
+        Return the configured brands of a payment method.
+
+        :param payment_method: default: the default payment method
+        :return: tuple of Brand
+        """
+        return self.methods.get(payment_method or self.default_method, ())
+
+    def filter(self, payment_method=None, currency=None, amount=None,
+               country=None):
+        """
+        Return the brands of a payment method usable for a basket.
+
+        Restrictions are only applied for given arguments.
+
+        :param payment_method: default: the default payment method
+        :param currency: ISO 4217 currency code
+        :param amount: basket total
+        :param country: ISO 3166-1 alpha-2 country code
+        :return: tuple of Brand
+        """
+        payment_method = payment_method or self.default_method
+        currency = currency.upper() if currency else None
+        country = country.upper() if country else None
+
+        key = (payment_method, currency, country)
+        try:
+            brands = self._candidates[key]
+        except KeyError:
+            brands = self._candidates[key] = tuple(
+                brand for brand in self.get_brands(payment_method)
+                if (currency is None or brand.currencies is None or
+                    currency in brand.currencies) and
+                   (country is None or brand.countries is None or
+                    country in brand.countries)
+            )
+
+        if amount is not None:
+            amount = _decimal(amount)
+            brands = tuple(b for b in brands if b.accepts_amount(amount))
+        return brands
+
+    def widget_config(self, brands):
+        """
+        Return the template context used to render the payment widget.
+
+        `custom_brands_html` holds the card brand logos shown next to the
+        card number input, pre-rendered as JS string literal so the widget
+        only has to insert them once.
+
+        :param brands: tuple of Brand
+        :return: dict
+        """
+        try:
+            return self._widget_configs[brands]
+        except KeyError:
+            pass
+
+        custom_brands = ''.join(
+            '<div class="wpwl-brand-card wpwl-brand-custom wpwl-brand-%s">'
+            '</div>' % brand.name
+            for brand in brands if brand.kind == CARD
+        )
+        config = self._widget_configs[brands] = {
+            'payment_brands': ' '.join(brand.name for brand in brands),
+            'custom_brands_html': json.dumps(custom_brands)
+            if custom_brands else '',
+        }
+        return config
+
+
+_registry = None
+
+
+def get_registry():
+    """
+    Return the BrandRegistry for the current settings.
+    """
+    global _registry
+    if _registry is None:
+        _registry = BrandRegistry(
+            settings.OPP_PAYMENT_METHODS,
+            default_method=settings.OPP_DEFAULT_PAYMENT_METHOD,
+            limits=settings.OPP_PAYMENT_BRAND_LIMITS,
+        )
+    return _registry
+
+
+@receiver(setting_changed)
+def reset_registry(**kwargs):
+    global _registry
+    if kwargs['setting'].startswith('OPP_'):
+        _registry = None
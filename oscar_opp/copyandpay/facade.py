@@ -7,27 +7,32 @@ from decimal import Decimal as D
 from django.conf import settings
 from django.template.loader import get_template
 
+from .brands import get_registry
 from .gateway import Gateway
+from .responses import CheckoutResponse, PaymentStatusResponse
 from ..exceptions import OpenPaymentPlatformError
 from ..models import PaymentStatusCode, Transaction
+from ..ratelimit import check_rate_limit
+from ..routers import get_primary_alias
 
 logger = logging.getLogger('opp')
 
 
-def get_result(data):
-    result = data.get('result', {})
-    return result.get('code'), result.get('description')
-
-
 class Facade(object):
-    def __init__(self, checkout_id=None):
+    def __init__(self, checkout_id=None, read_only=False):
         """
         Initialize OPP COPYandPAY facade.
 
         A `checkout_id` must be given to continue in step 3.
         It is initially retrieved and set in step 1 (prepare_checkout).
 
+        A `read_only` facade looks up the transaction on a replica database
+        and refuses to update it, eg. to display the status of a terminal
+        transaction. Otherwise the primary database is used to read our own
+        writes.
+
         :param checkout_id:
+        :param read_only: default: False
         """
         self.gateway = Gateway(
             host=settings.OPP_BASE_URL,
@@ -35,9 +40,14 @@ class Facade(object):
             auth_entityid=settings.OPP_ENTITY_ID,
             auth_password=settings.OPP_PASSWORD,
         )
+        self.read_only = read_only
         self.transaction = None
         if checkout_id:
-            self.transaction = Transaction.objects.get(checkout_id=checkout_id)
+            if read_only:
+                queryset = Transaction.objects.replica()
+            else:
+                queryset = Transaction.objects.primary()
+            self.transaction = queryset.get_by_checkout_id(checkout_id)
 
     @property
     def entity_id(self):
@@ -66,65 +76,107 @@ class Facade(object):
         for key, value in kwargs.items():
             setattr(self.transaction, key, value)
         if commit:
-            self.transaction.save()
+            self._save_transaction()
+
+    def _check_writable(self):
+        if self.read_only:
+            raise OpenPaymentPlatformError(
+                "This instance is read-only"
+            )
+
+    def _save_transaction(self):
+        self._check_writable()
+        self.transaction.save(using=get_primary_alias())
 
     def prepare_checkout(
             self, amount, currency,
             payment_type='DB',
             merchant_invoice_id=None,
             merchant_transaction_id=None,
+            reuse=None,
+            rate_limit_keys=None,
     ):
         """
         COPYandPAY step 1: Prepare the checkout
 
         https://docs.oppwa.com/tutorials/integration-guide#CNPStep1
 
+        If `reuse` is enabled, a fresh pending checkout prepared earlier for
+        the same amount, currency, payment type and merchant invoice id (eg.
+        by oscar_opp.copyandpay.prefetch) is used instead of calling OPP.
+        Checkouts without `merchant_invoice_id` or with a
+        `merchant_transaction_id` are never reused.
+        A checkout is reused only once: it is handed out to this facade, so
+        a reload or a second browser tab prepares a new checkout instead of
+        sharing one.
+
         :param amount:
         :param currency:
         :param payment_type: default: 'DB'
         :param merchant_invoice_id:
         :param merchant_transaction_id:
+        :param reuse: default: OPP_PREFETCH_CHECKOUTS
+        :param rate_limit_keys: client keys checked against OPP_RATE_LIMIT
+            before calling OPP, see oscar_opp.ratelimit.get_client_keys
         :return:
         """
         if self.transaction:
             raise OpenPaymentPlatformError(
                 "This instance is already linked to a Transaction"
             )
-
-        response = self.gateway.get_checkout_id(
+        self._check_writable()
+
+        if reuse is None:
+            reuse = settings.OPP_PREFETCH_CHECKOUTS
+        if reuse and merchant_invoice_id and not merchant_transaction_id:
+            transaction = Transaction.objects.primary().pending(
+                D(amount), currency, merchant_invoice_id, payment_type,
+            ).first()
+            # a concurrent request may hand it out first
+            if transaction and Transaction.objects.primary().filter(
+                pk=transaction.pk,
+                date_created=transaction.date_created,
+                handed_out=False,
+            ).update(handed_out=True):
+                transaction.handed_out = True
+                self.transaction = transaction
+                logger.info('prepare_checkout reused: checkout_id="%s"',
+                            self.transaction.checkout_id)
+                return
+
+        check_rate_limit(rate_limit_keys)
+        response = CheckoutResponse.from_response(self.gateway.get_checkout_id(
             amount=D(amount),
             currency=currency,
             payment_type=payment_type,
             merchant_transaction_id=merchant_transaction_id,
             merchant_invoice_id=merchant_invoice_id,
-        )
+        ))
 
         self.transaction = Transaction(
             amount=amount,
             currency=currency,
-            raw_request=response.request.body,
-            raw_response=response.content,
-            response_time=response.elapsed.total_seconds() * 1000,
-            correlation_id=merchant_invoice_id,
+            payment_type=payment_type,
+            raw_request=response.raw_request,
+            raw_response=response.raw_response,
+            response_time=response.response_time,
+            correlation_id=merchant_invoice_id or '',
         )
 
         if not response.ok:
             logger.error('prepare_checkout: %s', response.status_code)
         else:
-            data = response.json()
-            checkout_id = data.get('id')
-            result_code, result_description = get_result(data)
-
             logger.info('prepare_checkout success: checkout_id="%s", '
                         'result_code="%s", result_description="%s"',
-                         checkout_id, result_code, result_description)
+                        response.checkout_id, response.result_code,
+                        response.result_description)
             self._update_transaction(
-                checkout_id=checkout_id,
-                result_code=result_code,
-                result_description=result_description,
+                checkout_id=response.checkout_id,
+                result_code=response.result_code,
+                result_description=response.result_description,
             )
 
-        self.transaction.save()
+        self._save_transaction()
 
     def get_payment_status(self):
         """
@@ -134,7 +186,10 @@ class Facade(object):
 
         :return:
         """
-        response = self.gateway.get_payment_status(self.transaction.checkout_id)
+        self._check_writable()
+        response = PaymentStatusResponse.from_response(
+            self.gateway.get_payment_status(self.transaction.checkout_id)
+        )
         if not response.ok:
             logger.error(
                 'get_payment_status failed: checkout_id="%s", status_code=%s',
@@ -143,26 +198,23 @@ class Facade(object):
             )
             return PaymentStatusCode.UNKNOWN_ERROR
 
-        data = response.json()
-        entity_id = data.get('id')
-        #payment_brand = data.get('paymentBrand')
-        result_code, result_description = get_result(data)
+        result_code = response.result_code
         logger.info(
             'get_payment_status success: checkout_id="%s", entity_id="%s", '
-            'result_code="%s", result_description="%s"',
-            self.transaction.checkout_id, entity_id, result_code,
-            result_description,
+            'payment_brand="%s", result_code="%s", result_description="%s"',
+            self.transaction.checkout_id, response.entity_id,
+            response.payment_brand, result_code, response.result_description,
         )
 
         self._update_transaction(
             # save payment transaction entity id (used in notifications)
-            entity_id=entity_id,
+            entity_id=response.entity_id,
             # overwrite fields with data from step 1
             result_code=result_code,
-            result_description=result_description,
-            raw_request=response.request.body or '',
-            raw_response=response.content,
-            response_time=response.elapsed.total_seconds() * 1000,
+            result_description=response.result_description,
+            raw_request=response.raw_request,
+            raw_response=response.raw_response,
+            response_time=response.response_time,
             # save
             commit=True,
         )
@@ -174,9 +226,32 @@ class Facade(object):
             return PaymentStatusCode.UNKNOWN_ERROR
 
     def get_payment_brands(self, payment_method=None):
-        payment_method = payment_method \
-            if payment_method else settings.DEFAULT_PAYMENT_METHOD
-        return settings.OPP_PAYMENT_METHODS.get(payment_method)
+        """
+        Return the configured brands of a payment method.
+
+        :param payment_method: default: OPP_DEFAULT_PAYMENT_METHOD
+        :return: space-separated brand names
+        """
+        brands = get_registry().get_brands(payment_method)
+        return ' '.join(brand.name for brand in brands)
+
+    def filter_payment_brands(self, payment_method=None, country=None):
+        """
+        Return the brands of a payment method usable for this transaction.
+
+        Brands are filtered by the transaction's currency and amount and,
+        if given, the shopper's country.
+
+        :param payment_method: default: OPP_DEFAULT_PAYMENT_METHOD
+        :param country: ISO 3166-1 alpha-2 country code
+        :return: tuple of Brand
+        """
+        return get_registry().filter(
+            payment_method,
+            currency=self.currency,
+            amount=self.amount,
+            country=country,
+        )
 
     def get_form(self, callback, locale, payment_method=None, address=None):
         """
@@ -188,13 +263,31 @@ class Facade(object):
         :param locale:
         :param payment_method:
         :param address:
+        :raises OpenPaymentPlatformError: if no brand is usable
         :return:
         """
+        country = getattr(address, 'country', None)
+        # oscar addresses reference a Country instance
+        country = getattr(country, 'iso_3166_1_a2', country)
+        brands = self.filter_payment_brands(payment_method, country=country)
+        if not brands:
+            logger.error(
+                'get_form: no payment brand of %s usable for checkout_id="%s", '
+                'currency="%s", amount="%s", country="%s"',
+                payment_method or settings.OPP_DEFAULT_PAYMENT_METHOD,
+                self.transaction.checkout_id, self.currency, self.amount,
+                country,
+            )
+            raise OpenPaymentPlatformError(
+                "No payment brand available for this order"
+            )
+        widget_config = get_registry().widget_config(brands)
         ctx = {
             'checkout_id': self.transaction.checkout_id,
             'locale': locale,
             'address': address,
-            'payment_method': self.get_payment_brands(payment_method),
+            'payment_method': widget_config['payment_brands'],
+            'custom_brands_html': widget_config['custom_brands_html'],
             'shopper_result_url': callback,
             'gateway_host': self.gateway.host,
         }
@@ -6,6 +6,9 @@ from urllib import parse
 
 import requests
 
+from ..conf import settings
+from ..ratelimit import get_concurrency_limiter
+
 logger = logging.getLogger('opp')
 
 
@@ -23,11 +26,15 @@ class Gateway(object):
     CHECKOUTS_ENDPOINT = "checkouts"
     CHECKOUTS_DETAIL_ENDPOINT = "checkouts/{checkout_id}/payment"
 
-    def __init__(self, host, auth_userid, auth_password, auth_entityid):
+    def __init__(self, host, auth_userid, auth_password, auth_entityid,
+                 timeout=None):
         self.host = host
         self.auth_userId = auth_userid
         self.auth_password = auth_password
         self.auth_entityid = auth_entityid
+        # seconds, default: OPP_REQUEST_TIMEOUT
+        self.timeout = timeout if timeout is not None \
+            else settings.OPP_REQUEST_TIMEOUT
 
     def check_credentials(self):
         # TODO: [a-f0-9]{32}  \   [a-zA-Z0-9]{8,32}   \ [a-f0-9]{32}
@@ -74,11 +81,13 @@ class Gateway(object):
         if merchant_invoice_id:
             data['merchantInvoiceId'] = merchant_invoice_id
 
-        response = requests.post(
-            parse.urljoin(self.host, self.CHECKOUTS_ENDPOINT),
-            data
-        )
-        logger.debug('RESPONSE: Url: {}\nHeaders: {}\nStatus: {}\nData: {}'.format(response.url, response.headers, response.status_code, repr(response.content)))
+        with get_concurrency_limiter():
+            response = requests.post(
+                parse.urljoin(self.host, self.CHECKOUTS_ENDPOINT),
+                data,
+                timeout=self.timeout,
+            )
+        logger.debug('RESPONSE: Url: %s\nHeaders: %s\nStatus: %s\nData: %r', response.url, response.headers, response.status_code, response.content)
         return response
 
     def get_payment_status(self, checkout_id):
@@ -94,9 +103,11 @@ class Gateway(object):
 
         https://docs.oppwa.com/tutorials/integration-guide#CNPStep3
         """
-        response = requests.get(
-            parse.urljoin(self.host, self.CHECKOUTS_DETAIL_ENDPOINT.format(checkout_id=checkout_id))
-        )
-        logger.debug('Url: {}\nHeaders: {}\nStatus: {}\nData: {}'.format(response.url, response.headers, response.status_code, repr(response.content)))
+        with get_concurrency_limiter():
+            response = requests.get(
+                parse.urljoin(self.host, self.CHECKOUTS_DETAIL_ENDPOINT.format(checkout_id=checkout_id)),
+                timeout=self.timeout,
+            )
+        logger.debug('Url: %s\nHeaders: %s\nStatus: %s\nData: %r', response.url, response.headers, response.status_code, response.content)
         return response
 
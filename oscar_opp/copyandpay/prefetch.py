@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Prepare COPYandPAY checkouts in the background.
+
+With `OPP_PREFETCH_CHECKOUTS` enabled, call `prefetch_checkout` as soon as
+the basket total is known. The checkout is stored as pending Transaction
+and picked up by `Facade.prepare_checkout`, so rendering the payment form
+does not wait for OPP. Checkouts older than `OPP_CHECKOUT_TTL` are stale:
+they are not reused anymore and the next prefetch replaces them.
+
+At most `OPP_PREFETCH_QUEUE_SIZE` prefetches wait for one of the
+`OPP_PREFETCH_WORKERS` threads; further ones are skipped, the payment page
+then prepares the checkout itself.
+"""
+from __future__ import unicode_literals
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal as D
+
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+
+from .facade import Facade
+from ..conf import settings
+from ..exceptions import RateLimitExceeded
+from ..models import Transaction
+
+logger = logging.getLogger('opp')
+
+_executor = None
+# running and queued prefetches of _executor
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the executor and the semaphore bounding its queue.
+    """
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.OPP_PREFETCH_WORKERS,
+            )
+            _slots = threading.BoundedSemaphore(
+                settings.OPP_PREFETCH_WORKERS +
+                settings.OPP_PREFETCH_QUEUE_SIZE
+            )
+        return _executor, _slots
+
+
+@receiver(setting_changed)
+def reset_executor(**kwargs):
+    global _executor, _slots
+    if kwargs['setting'].startswith('OPP_PREFETCH_'):
+        with _executor_lock:
+            if _executor is not None:
+                # queued prefetches still run
+                _executor.shutdown(wait=False)
+            _executor = None
+            _slots = None
+
+
+def prefetch_checkout(amount, currency, merchant_invoice_id,
+                      payment_type='DB', rate_limit_keys=None):
+    """
+    Prepare a checkout in the background.
+
+    :param amount:
+    :param currency:
+    :param merchant_invoice_id: required, the checkout is reused by it
+    :param payment_type: default: 'DB'
+    :param rate_limit_keys: client keys checked against OPP_RATE_LIMIT if
+        OPP is called
+    :return: Future of the prepared Transaction (None if not needed),
+        None if prefetching is disabled or the queue is full
+    """
+    if not settings.OPP_PREFETCH_CHECKOUTS:
+        return None
+    if not merchant_invoice_id:
+        logger.warning('prefetch_checkout skipped: no merchant_invoice_id')
+        return None
+    executor, slots = get_executor()
+    if not slots.acquire(False):
+        logger.warning('prefetch_checkout skipped, queue full: '
+                       'correlation_id="%s"', merchant_invoice_id)
+        return None
+    try:
+        return executor.submit(
+            _run, slots, D(amount), currency, merchant_invoice_id,
+            payment_type, rate_limit_keys,
+        )
+    except Exception:
+        slots.release()
+        raise
+
+
+def _run(slots, *args):
+    try:
+        return prepare_checkout(*args)
+    finally:
+        # connections are per thread and not closed by a request cycle here
+        connections.close_all()
+        slots.release()
+
+
+def prepare_checkout(amount, currency, merchant_invoice_id,
+                     payment_type='DB', rate_limit_keys=None):
+    """
+    Prepare a checkout unless a fresh one is pending or already paid.
+
+    :return: the prepared Transaction or None
+    """
+    if not merchant_invoice_id:
+        logger.warning('prefetch_checkout skipped: no merchant_invoice_id')
+        return None
+    try:
+        transactions = Transaction.objects.primary().filter(
+            correlation_id=merchant_invoice_id,
+        )
+        if transactions.exclude(entity_id=None).exists():
+            logger.debug('prefetch_checkout skipped, payment started: '
+                         'correlation_id="%s"', merchant_invoice_id)
+            return None
+        if transactions.pending(
+            amount, currency, merchant_invoice_id, payment_type,
+        ).exists():
+            logger.debug('prefetch_checkout skipped, checkout pending: '
+                         'correlation_id="%s"', merchant_invoice_id)
+            return None
+
+        facade = Facade()
+        facade.prepare_checkout(
+            amount, currency,
+            payment_type=payment_type,
+            merchant_invoice_id=merchant_invoice_id,
+            reuse=False,
+            rate_limit_keys=rate_limit_keys,
+        )
+        return facade.transaction
+    except RateLimitExceeded:
+        logger.warning('prefetch_checkout rate limited: correlation_id="%s"',
+                       merchant_invoice_id)
+    except Exception:
+        logger.exception('prefetch_checkout failed: correlation_id="%s"',
+                         merchant_invoice_id)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Compact, parse-once models of OPP gateway responses.
+
+Only the fields used by the facade and the Transaction model are kept, the
+parsed JSON document is discarded. The responses are built from status code
+and body, so they work with any HTTP client; `from_response` accepts
+`requests`-like response objects.
+"""
+from __future__ import unicode_literals
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def loads(content):
+    """
+    Parse a JSON document, using orjson if it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    return json.loads(content)
+
+
+def _text(content):
+    if isinstance(content, bytes):
+        return content.decode('utf-8', 'replace')
+    return content or ''
+
+
+class GatewayResponse(object):
+    __slots__ = (
+        'status_code', 'raw_request', 'raw_response', 'response_time',
+        'id', 'result_code', 'result_description',
+    )
+
+    def __init__(self, status_code, content, raw_request='', response_time=0):
+        """
+        :param status_code: HTTP status code
+        :param content: response body, bytes or text
+        :param raw_request: request body
+        :param response_time: response time in milliseconds
+        """
+        self.status_code = status_code
+        self.raw_request = _text(raw_request)
+        self.raw_response = _text(content)
+        self.response_time = response_time
+        self.id = None
+        self.result_code = None
+        self.result_description = None
+        if self.ok:
+            self.parse(loads(content))
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(
+            response.status_code,
+            response.content,
+            raw_request=response.request.body,
+            response_time=response.elapsed.total_seconds() * 1000,
+        )
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def parse(self, data):
+        self.id = data.get('id')
+        result = data.get('result') or {}
+        self.result_code = result.get('code')
+        self.result_description = result.get('description')
+
+
+class CheckoutResponse(GatewayResponse):
+    """
+    Response of COPYandPAY step 1, `id` is the checkout id.
+    """
+    __slots__ = ()
+
+    @property
+    def checkout_id(self):
+        return self.id
+
+
+class PaymentStatusResponse(GatewayResponse):
+    """
+    Response of COPYandPAY step 3, `id` is the payment's entity id.
+    """
+    __slots__ = ('payment_brand', 'payment_type')
+
+    def __init__(self, *args, **kwargs):
+        self.payment_brand = None
+        self.payment_type = None
+        super(PaymentStatusResponse, self).__init__(*args, **kwargs)
+
+    def parse(self, data):
+        super(PaymentStatusResponse, self).parse(data)
+        self.payment_brand = data.get('paymentBrand')
+        self.payment_type = data.get('paymentType')
+
+    @property
+    def entity_id(self):
+        return self.id
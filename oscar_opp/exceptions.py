@@ -11,3 +11,11 @@ except ImportError:
 
 class OpenPaymentPlatformError(PaymentError):
     pass
+
+
+class RateLimitExceeded(OpenPaymentPlatformError):
+    pass
+
+
+class GatewayOverloaded(OpenPaymentPlatformError):
+    pass
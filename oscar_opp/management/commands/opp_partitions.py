@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from ... import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain monthly partitions of the OPP transaction table "
+        "(PostgreSQL only)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help="Database alias, default: %s" % DEFAULT_DB_ALIAS,
+        )
+        parser.add_argument(
+            '--convert', action='store_true',
+            help="Convert the plain table to a partitioned table first.",
+        )
+        parser.add_argument(
+            '--months', type=int, default=3,
+            help="Number of monthly partitions to create ahead, "
+                 "starting with the current month, default: 3",
+        )
+        parser.add_argument(
+            '--drop-before', metavar='YYYY-MM',
+            help="Drop the partitions of all months before this month.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not partitioning.is_supported(connection):
+            self.stdout.write(
+                "Partitioning is not supported on %s, nothing to do."
+                % connection.vendor
+            )
+            return
+
+        today = timezone.now().date()
+        if options['convert'] and partitioning.convert(
+                connection, today, options['months']):
+            self.stdout.write("Converted %s to a partitioned table."
+                              % partitioning.get_table_name())
+        if not partitioning.is_partitioned(connection):
+            raise CommandError(
+                "%s is not partitioned, use --convert."
+                % partitioning.get_table_name()
+            )
+
+        names = partitioning.create_partitions(
+            connection, today, options['months'],
+        )
+        for name in names:
+            self.stdout.write("Partition %s ready." % name)
+
+        if options['drop_before']:
+            try:
+                date = datetime.datetime.strptime(
+                    options['drop_before'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("Invalid month: %s" % options['drop_before'])
+            for name in partitioning.drop_partitions_before(connection, date):
+                self.stdout.write("Dropped partition %s." % name)
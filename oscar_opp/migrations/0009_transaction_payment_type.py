@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oscar_opp', '0008_auto_20261019_1200'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='payment_type',
+            field=models.CharField(blank=True, default='', max_length=2),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oscar_opp', '0009_transaction_payment_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='handed_out',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
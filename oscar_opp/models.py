@@ -2,13 +2,16 @@
 from __future__ import unicode_literals
 
 import re
+from datetime import timedelta
 from enum import Enum, unique
 
 from django.db import models
+from django.utils import timezone
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
-from . import base
+from . import base, routers
+from .conf import settings
 
 
 @unique
@@ -59,6 +62,82 @@ VALID_STATUS = [
 VALID_STATUS_CODES = [s.value for s in VALID_STATUS]
 
 
+class TransactionQuerySet(models.QuerySet):
+    def created_between(self, start=None, end=None):
+        """
+        Restrict to transactions created in [start, end).
+
+        Filtering on `date_created` lets PostgreSQL skip all partitions
+        outside the range, see oscar_opp.partitioning.
+        """
+        qs = self
+        if start is not None:
+            qs = qs.filter(date_created__gte=start)
+        if end is not None:
+            qs = qs.filter(date_created__lt=end)
+        return qs
+
+    def recent(self):
+        return self.order_by('-date_created')
+
+    def primary(self):
+        """
+        Read from the primary database, eg. to read your own writes.
+        """
+        return self.using(routers.get_primary_alias())
+
+    def replica(self):
+        """
+        Read from a replica database, eg. for reporting.
+        """
+        return self.using(routers.get_replica_alias())
+
+    def terminal(self):
+        """
+        Restrict to transactions whose payment status has been fetched.
+
+        These are not written by the checkout anymore and can safely be
+        read from a replica.
+        """
+        return self.exclude(entity_id=None)
+
+    def pending(self, amount, currency, correlation_id, payment_type,
+                max_age=None):
+        """
+        Restrict to fresh prepared checkouts without payment status, not
+        handed out to a payment page yet, newest first.
+
+        :param max_age: seconds, default: OPP_CHECKOUT_TTL
+        """
+        if max_age is None:
+            max_age = settings.OPP_CHECKOUT_TTL
+        return self.created_between(
+            start=timezone.now() - timedelta(seconds=max_age),
+        ).filter(
+            amount=amount,
+            currency=currency,
+            correlation_id=correlation_id,
+            payment_type=payment_type,
+            result_code=PaymentStatusCode.SUCCESS_CHECKOUT_CREATED.value,
+            entity_id=None,
+            handed_out=False,
+        ).recent()
+
+    def get_by_checkout_id(self, checkout_id, days=None):
+        """
+        Get a transaction by checkout id.
+
+        Only transactions created within the last `days` days (default:
+        OPP_TRANSACTION_LOOKUP_DAYS, None to search all) are considered.
+        """
+        if days is None:
+            days = settings.OPP_TRANSACTION_LOOKUP_DAYS
+        qs = self
+        if days is not None:
+            qs = qs.created_between(start=timezone.now() - timedelta(days=days))
+        return qs.get(checkout_id=checkout_id)
+
+
 @python_2_unicode_compatible
 class Transaction(base.ResponseModel):
     """
@@ -79,6 +158,19 @@ class Transaction(base.ResponseModel):
         blank=True,
     )
 
+    # OPP payment type, eg. "DB" (debit) or "PA" (preauthorization)
+    payment_type = models.CharField(
+        max_length=2,
+        blank=True,
+    )
+
+    # a prepared checkout was given to a payment page, see
+    # Facade.prepare_checkout
+    handed_out = models.BooleanField(
+        default=False,
+        editable=False,
+    )
+
     result_code = models.CharField(max_length=32)
     result_description = models.CharField(
         max_length=512,
@@ -106,9 +198,10 @@ class Transaction(base.ResponseModel):
         editable=False,
     )
 
+    objects = TransactionQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Transaction')
-        ordering = ('-date_created',)
 
     def __str__(self):
         return "Transaction %s" % self.id
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Monthly range partitioning of the Transaction table on PostgreSQL.
+
+PostgreSQL (>= 11) routes rows to the partition matching `date_created` and
+prunes partitions from queries filtering on `date_created`, so lookups and
+vacuum only touch the relevant months. Other databases keep using the plain
+table; all functions are no-ops there.
+"""
+from __future__ import unicode_literals
+
+import datetime
+
+from django.db import transaction
+
+from .models import Transaction
+
+# partition holding all rows that existed before the conversion
+LEGACY_SUFFIX = 'legacy'
+
+
+def is_supported(connection):
+    return connection.vendor == 'postgresql'
+
+
+def get_table_name():
+    return Transaction._meta.db_table
+
+
+def month_start(date):
+    return datetime.date(date.year, date.month, 1)
+
+
+def next_month(date):
+    if date.month == 12:
+        return datetime.date(date.year + 1, 1, 1)
+    return datetime.date(date.year, date.month + 1, 1)
+
+
+def get_partition_name(date):
+    return '%s_y%04dm%02d' % (get_table_name(), date.year, date.month)
+
+
+def get_default_partition_name():
+    return '%s_default' % get_table_name()
+
+
+def get_convert_sql(boundary):
+    """
+    Return the SQL to turn the plain table into a partitioned one.
+
+    Rows created before `boundary` (the first day of a month) stay in the
+    legacy partition, which also keeps owning the id sequence. Later rows
+    are moved to the default partition, from where `create_partitions`
+    moves them into their monthly partitions.
+
+    Primary key and unique constraints of a partitioned table must include
+    the partition key, so `checkout_id` and `entity_id` are only unique per
+    `date_created` in the database; OPP guarantees their uniqueness.
+    """
+    table = get_table_name()
+    legacy = '%s_%s' % (table, LEGACY_SUFFIX)
+    statements = [
+        'ALTER TABLE "{table}" RENAME TO "{legacy}"',
+        'CREATE TABLE "{table}" '
+        '(LIKE "{legacy}" INCLUDING DEFAULTS) '
+        'PARTITION BY RANGE ("date_created")',
+        'ALTER TABLE "{table}" ADD PRIMARY KEY ("id", "date_created")',
+        'ALTER TABLE "{table}" ADD UNIQUE ("checkout_id", "date_created")',
+        'ALTER TABLE "{table}" ADD UNIQUE ("entity_id", "date_created")',
+        'CREATE INDEX ON "{table}" ("date_created")',
+        # catches rows outside all monthly partitions, kept empty by
+        # create_partitions
+        'CREATE TABLE "{default}" PARTITION OF "{table}" DEFAULT',
+        'INSERT INTO "{table}" SELECT * FROM "{legacy}" '
+        "WHERE \"date_created\" >= '{boundary}'",
+        'DELETE FROM "{legacy}" '
+        "WHERE \"date_created\" >= '{boundary}'",
+        # a partition cannot have a primary key of its own, ATTACH adds the
+        # (column, date_created) constraints of the partitioned table
+        'DO $$DECLARE name text; BEGIN '
+        'FOR name IN SELECT conname FROM pg_constraint '
+        "WHERE conrelid = '\"{legacy}\"'::regclass AND contype IN ('p', 'u') "
+        'LOOP EXECUTE \'ALTER TABLE "{legacy}" DROP CONSTRAINT \' '
+        '|| quote_ident(name); END LOOP; END$$',
+        'ALTER TABLE "{table}" ATTACH PARTITION "{legacy}" '
+        "FOR VALUES FROM (MINVALUE) TO ('{boundary}')",
+    ]
+    return [s.format(
+        table=table,
+        legacy=legacy,
+        default=get_default_partition_name(),
+        boundary=month_start(boundary).isoformat(),
+    ) for s in statements]
+
+
+def get_partition_sql(date):
+    """
+    Return the SQL to create the partition for the month of `date`.
+
+    Rows of that month already in the default partition are moved to the
+    new partition, PostgreSQL refuses to attach it otherwise.
+    """
+    start = month_start(date)
+    statements = [
+        'CREATE TABLE "{partition}" (LIKE "{table}" INCLUDING DEFAULTS)',
+        'WITH moved AS (DELETE FROM "{default}" '
+        "WHERE \"date_created\" >= '{start}' AND \"date_created\" < '{end}' "
+        'RETURNING *) INSERT INTO "{partition}" SELECT * FROM moved',
+        'ALTER TABLE "{table}" ATTACH PARTITION "{partition}" '
+        "FOR VALUES FROM ('{start}') TO ('{end}')",
+    ]
+    return [s.format(
+        partition=get_partition_name(start),
+        table=get_table_name(),
+        default=get_default_partition_name(),
+        start=start.isoformat(),
+        end=next_month(start).isoformat(),
+    ) for s in statements]
+
+
+def is_partitioned(connection):
+    if not is_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table p '
+            'JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s',
+            [get_table_name()],
+        )
+        return cursor.fetchone() is not None
+
+
+def _table_exists(cursor, name):
+    cursor.execute('SELECT to_regclass(%s)', ['"%s"' % name])
+    return cursor.fetchone()[0] is not None
+
+
+def convert(connection, start, months=1):
+    """
+    Convert the Transaction table to a partitioned table.
+
+    Rows created before the month of `start` stay in the legacy partition,
+    partitions are created for `months` months beginning at `start` (at
+    least 1, so the default partition ends up empty).
+
+    :return: True if the table was converted
+    """
+    if not is_supported(connection) or is_partitioned(connection):
+        return False
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            for statement in get_convert_sql(start):
+                cursor.execute(statement)
+        create_partitions(connection, start, max(months, 1))
+    return True
+
+
+def create_partitions(connection, start, months):
+    """
+    Create the monthly partitions for `months` months beginning at `start`.
+
+    :return: list of created partition names
+    """
+    if not is_partitioned(connection):
+        return []
+    names = []
+    date = month_start(start)
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            for __ in range(months):
+                name = get_partition_name(date)
+                if not _table_exists(cursor, name):
+                    for statement in get_partition_sql(date):
+                        cursor.execute(statement)
+                    names.append(name)
+                date = next_month(date)
+    return names
+
+
+def drop_partitions_before(connection, date):
+    """
+    Drop the monthly partitions of all months before `date`.
+
+    :return: list of dropped partition names
+    """
+    if not is_partitioned(connection):
+        return []
+    date = month_start(date)
+    prefix = '%s_y' % get_table_name()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s',
+            [get_table_name()],
+        )
+        names = sorted(
+            name for (name,) in cursor.fetchall()
+            if name.startswith(prefix) and name < get_partition_name(date)
+        )
+        for name in names:
+            cursor.execute('DROP TABLE "%s"' % name)
+    return names
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Rate limiting of clients and load shedding of requests to OPP.
+
+Clients (session, basket and IP address, see `OPP_RATE_LIMIT_IP_HEADER`)
+get a token bucket of `OPP_RATE_LIMIT` requests, stored in the
+`OPP_RATE_LIMIT_CACHE` cache or in memory if the cache is not configured or
+unavailable. Updates of cached buckets are not atomic, concurrent requests
+of one client may overspend a bucket slightly.
+
+Concurrent requests to OPP are capped per process by
+`OPP_MAX_CONCURRENT_REQUESTS`; requests over the cap fail immediately.
+"""
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .conf import settings
+from .exceptions import GatewayOverloaded, RateLimitExceeded
+
+logger = logging.getLogger('opp')
+
+
+class MemoryStorage(object):
+    def __init__(self, max_entries=10000):
+        """
+        :param max_entries: buckets kept, the least recently used ones are
+            dropped first (a dropped bucket is full again)
+        """
+        self.max_entries = max_entries
+        # held by TokenBucket to update buckets atomically
+        self.lock = threading.RLock()
+        self.buckets = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            value = self.buckets.pop(key, None)
+            if value is not None:
+                self.buckets[key] = value
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.buckets.pop(key, None)
+            self.buckets[key] = value
+            while len(self.buckets) > self.max_entries:
+                self.buckets.popitem(last=False)
+
+
+class _NoLock(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class CacheStorage(object):
+    def __init__(self, cache, fallback=None):
+        self.cache = cache
+        self.fallback = fallback or MemoryStorage()
+        # updates are not atomic across processes anyway, so requests are
+        # not serialized while waiting for the cache
+        self.lock = _NoLock()
+
+    def get(self, key):
+        try:
+            return self.cache.get(key)
+        except Exception:
+            logger.warning('rate limit cache unavailable', exc_info=True)
+            return self.fallback.get(key)
+
+    def set(self, key, value, timeout):
+        try:
+            self.cache.set(key, value, timeout)
+        except Exception:
+            logger.warning('rate limit cache unavailable', exc_info=True)
+            self.fallback.set(key, value, timeout)
+
+
+class TokenBucket(object):
+    KEY_PREFIX = 'opp-ratelimit:'
+
+    def __init__(self, capacity, period, storage=None):
+        """
+        :param capacity: number of requests allowed in a burst
+        :param period: seconds to refill an empty bucket
+        :param storage: default: MemoryStorage
+        """
+        self.capacity = capacity
+        self.period = period
+        self.rate = float(capacity) / period
+        self.storage = storage or MemoryStorage()
+
+    def consume(self, key, tokens=1, now=None):
+        """
+        Take `tokens` from the bucket of `key`.
+
+        :return: True if the tokens were available
+        """
+        return self.consume_all([key], tokens=tokens, now=now) is None
+
+    def consume_all(self, keys, tokens=1, now=None):
+        """
+        Take `tokens` from the buckets of all `keys`, or from none of them.
+
+        :return: the first key without enough tokens, None on success
+        """
+        if now is None:
+            now = time.time()
+        with self.storage.lock:
+            buckets = []
+            for key in keys:
+                state = self.storage.get(self.KEY_PREFIX + key)
+                if state is None:
+                    available = self.capacity
+                else:
+                    available, timestamp = state
+                    available = min(
+                        self.capacity,
+                        available + (now - timestamp) * self.rate,
+                    )
+                if available < tokens:
+                    return key
+                buckets.append((key, available))
+            for key, available in buckets:
+                self.storage.set(
+                    self.KEY_PREFIX + key, (available - tokens, now),
+                    self.period,
+                )
+        return None
+
+
+class ConcurrencyLimiter(object):
+    def __init__(self, limit=None):
+        """
+        :param limit: maximum number of concurrent requests, None for no limit
+        """
+        self.limit = limit
+        self.semaphore = threading.BoundedSemaphore(limit) if limit else None
+
+    def __enter__(self):
+        if self.semaphore and not self.semaphore.acquire(False):
+            logger.warning('OPP request shed: %s concurrent requests',
+                           self.limit)
+            raise GatewayOverloaded(
+                "Too many concurrent requests to the payment provider"
+            )
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.semaphore:
+            self.semaphore.release()
+
+
+_rate_limiter = None
+_concurrency_limiter = None
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Return the TokenBucket for the current settings, None if disabled.
+    """
+    global _rate_limiter
+    with _limiters_lock:
+        if _rate_limiter is None and settings.OPP_RATE_LIMIT:
+            capacity, period = settings.OPP_RATE_LIMIT
+            storage = None
+            if settings.OPP_RATE_LIMIT_CACHE:
+                storage = CacheStorage(caches[settings.OPP_RATE_LIMIT_CACHE])
+            _rate_limiter = TokenBucket(capacity, period, storage=storage)
+        return _rate_limiter
+
+
+def get_concurrency_limiter():
+    global _concurrency_limiter
+    with _limiters_lock:
+        if _concurrency_limiter is None:
+            _concurrency_limiter = ConcurrencyLimiter(
+                settings.OPP_MAX_CONCURRENT_REQUESTS,
+            )
+        return _concurrency_limiter
+
+
+@receiver(setting_changed)
+def reset_limiters(**kwargs):
+    global _rate_limiter, _concurrency_limiter
+    if kwargs['setting'].startswith('OPP_'):
+        with _limiters_lock:
+            _rate_limiter = None
+            _concurrency_limiter = None
+
+
+def get_client_address(request):
+    """
+    Return the client IP address from `OPP_RATE_LIMIT_IP_HEADER`.
+
+    Of a list of addresses (X-Forwarded-For), the last one is used: it was
+    added by your proxy, earlier ones are sent by the client.
+    """
+    header = settings.OPP_RATE_LIMIT_IP_HEADER
+    if not header:
+        return None
+    addresses = request.META.get(header, '').split(',')
+    return addresses[-1].strip() or None
+
+
+def get_client_keys(request, basket=None):
+    """
+    Return the rate limit keys of a client: session, IP address (if
+    `OPP_RATE_LIMIT_IP_HEADER` is set) and basket.
+    """
+    keys = []
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        keys.append('session:%s' % session.session_key)
+    address = get_client_address(request)
+    if address:
+        keys.append('ip:%s' % address)
+    if basket is not None and basket.id:
+        keys.append('basket:%s' % basket.id)
+    return keys
+
+
+def check_rate_limit(keys):
+    """
+    Take a token for each key, raise RateLimitExceeded if one is exhausted.
+
+    No token is taken if any key is exhausted.
+    """
+    limiter = get_rate_limiter()
+    if limiter is None or not keys:
+        return
+    key = limiter.consume_all(keys)
+    if key is not None:
+        logger.warning('rate limit exceeded: %s', key)
+        raise RateLimitExceeded(
+            "Too many payment attempts, please try again later"
+        )
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Database routing of OPP models to a primary and read replicas.
+
+Enable by adding the router to `DATABASE_ROUTERS`::
+
+    DATABASE_ROUTERS = ['oscar_opp.routers.ReplicaRouter']
+    OPP_REPLICA_DATABASES = ['replica']
+
+Reads are spread over the replicas, writes go to the primary. Code paths
+that need to read their own writes (eg. the COPYandPAY facade) use
+`Transaction.objects.primary()` explicitly.
+"""
+from __future__ import unicode_literals
+
+import random
+
+from .conf import settings
+
+APP_LABEL = 'oscar_opp'
+
+
+def get_primary_alias():
+    return settings.OPP_PRIMARY_DATABASE
+
+
+def get_replica_alias():
+    """
+    Return a random replica alias, or the primary if there is none.
+    """
+    replicas = settings.OPP_REPLICA_DATABASES
+    if not replicas:
+        return get_primary_alias()
+    return random.choice(replicas)
+
+
+class ReplicaRouter(object):
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == APP_LABEL:
+            return get_replica_alias()
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == APP_LABEL:
+            return get_primary_alias()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if APP_LABEL in (obj1._meta.app_label, obj2._meta.app_label):
+            return True
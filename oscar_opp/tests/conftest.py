@@ -1,3 +1,6 @@
+import json
+from datetime import timedelta
+
 import pytest
 
 from oscar_opp.copyandpay.gateway import Gateway
@@ -16,3 +19,55 @@ def gateway():
 @pytest.fixture
 def facade():
     return Facade()
+
+
+class MockRequest(object):
+    body = 'authentication.userId=XXXXXX&amount=10.00&currency=EUR'
+
+
+class MockResponse(object):
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.content = json.dumps(data).encode('utf-8')
+        self.request = MockRequest()
+        self.elapsed = timedelta(milliseconds=300)
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+
+@pytest.fixture
+def mock_gateway(monkeypatch):
+    """
+    Replace OPP with a local mock, counting the calls per endpoint.
+    """
+    calls = {'get_checkout_id': 0, 'get_payment_status': 0}
+
+    def get_checkout_id(self, **kwargs):
+        calls['get_checkout_id'] += 1
+        return MockResponse({
+            'id': 'checkout-%d' % calls['get_checkout_id'],
+            'result': {
+                'code': '000.200.100',
+                'description': 'successfully created checkout',
+            },
+        })
+
+    def get_payment_status(self, checkout_id):
+        calls['get_payment_status'] += 1
+        return MockResponse({
+            'id': '8a82944a4cc25ebf014cc2c782423202',
+            'paymentType': 'DB',
+            'paymentBrand': 'VISA',
+            'result': {
+                'code': '000.100.110',
+                'description': "Request successfully processed in "
+                               "'Merchant in Integrator Test Mode'",
+            },
+        })
+
+    monkeypatch.setattr(Gateway, 'get_checkout_id', get_checkout_id)
+    monkeypatch.setattr(Gateway, 'get_payment_status', get_payment_status)
+    return calls
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import json
+from decimal import Decimal as D
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+
+from oscar_opp.checks import check_payment_brands
+from oscar_opp.copyandpay.brands import BrandRegistry
+
+
+@pytest.fixture
+def registry():
+    return BrandRegistry(
+        {
+            'opp_card': 'VISA MASTER AMEX',
+            'opp_eps': 'EPS',
+            'opp_mixed': ['VISA', 'SOFORTUEBERWEISUNG', 'PAYPAL'],
+        },
+        default_method='opp_card',
+        limits={'AMEX': {'currencies': ['usd'], 'max_amount': '1000.00'}},
+    )
+
+
+def test_unknown_brand():
+    registry = BrandRegistry({'opp_card': 'VISA BITCOIN'})
+    assert registry.unknown_brands == {'BITCOIN'}
+    names = [b.name for b in registry.filter('opp_card', currency='USD')]
+    assert names == ['VISA', 'BITCOIN']
+
+
+def test_additional_brand():
+    registry = BrandRegistry(
+        {'opp_card': 'VISA BITCOIN'},
+        limits={'BITCOIN': {'currencies': ['EUR']}},
+    )
+    assert registry.unknown_brands == set()
+    names = [b.name for b in registry.filter('opp_card', currency='USD')]
+    assert names == ['VISA']
+
+
+def test_unknown_default_method():
+    with pytest.raises(ImproperlyConfigured):
+        BrandRegistry({'opp_card': 'VISA'}, default_method='opp_eps')
+
+
+@pytest.mark.parametrize('limits', [
+    {'AMEX': {'min_amount': 'abc'}},
+    {'AMEX': {'currencies': 'EUR'}},
+    {'AMEX': 'EUR'},
+])
+def test_invalid_limits(limits):
+    with pytest.raises(ImproperlyConfigured):
+        BrandRegistry({'opp_card': 'VISA AMEX'}, limits=limits)
+
+
+@override_settings(OPP_PAYMENT_METHODS={'opp_card': 'VISA BITCOIN'},
+                   OPP_PAYMENT_BRAND_LIMITS={'VISA': {'max_amount': 'abc'}})
+def test_check_invalid_limits():
+    assert [e.id for e in check_payment_brands(None)] == ['oscar_opp.E001']
+
+
+@override_settings(OPP_PAYMENT_METHODS={'opp_card': 'VISA BITCOIN'})
+def test_check_unknown_brand():
+    assert [e.id for e in check_payment_brands(None)] == ['oscar_opp.W001']
+
+
+def test_filter_default_method(registry):
+    names = [b.name for b in registry.filter()]
+    assert names == ['VISA', 'MASTER', 'AMEX']
+
+
+def test_filter_currency(registry):
+    names = [b.name for b in registry.filter('opp_card', currency='EUR')]
+    assert names == ['VISA', 'MASTER']
+    assert registry.filter('opp_eps', currency='USD') == ()
+
+
+def test_filter_amount(registry):
+    names = [b.name for b in registry.filter(currency='USD', amount=D(5000))]
+    assert names == ['VISA', 'MASTER']
+    names = [b.name for b in registry.filter(currency='USD', amount=D(500))]
+    assert names == ['VISA', 'MASTER', 'AMEX']
+
+
+def test_filter_country(registry):
+    names = [b.name for b in registry.filter('opp_mixed', country='at')]
+    assert names == ['VISA', 'SOFORTUEBERWEISUNG', 'PAYPAL']
+    names = [b.name for b in registry.filter('opp_mixed', country='US')]
+    assert names == ['VISA', 'PAYPAL']
+    assert registry.filter('opp_eps', country='DE') == ()
+
+
+def test_widget_config(registry):
+    config = registry.widget_config(registry.filter('opp_mixed'))
+    assert config['payment_brands'] == 'VISA SOFORTUEBERWEISUNG PAYPAL'
+    assert json.loads(config['custom_brands_html']) == (
+        '<div class="wpwl-brand-card wpwl-brand-custom wpwl-brand-VISA">'
+        '</div>'
+    )
+    assert registry.widget_config(registry.filter('opp_eps')) == {
+        'payment_brands': 'EPS',
+        'custom_brands_html': '',
+    }
@@ -2,8 +2,24 @@
 import pytest
 from decimal import Decimal as D
 
+from django.test import override_settings
+
+from oscar_opp.copyandpay.facade import Facade
+from oscar_opp.exceptions import OpenPaymentPlatformError
+
 
 @pytest.mark.django_db
 def test_facade(facade):
     facade.prepare_checkout(D(10), 'EUR')
     facade.get_form(locale='en')
+
+
+@pytest.mark.django_db
+@override_settings(OPP_PAYMENT_METHODS={'opp_eps': 'EPS'},
+                   OPP_DEFAULT_PAYMENT_METHOD='opp_eps')
+def test_form_without_usable_brand(mock_gateway):
+    facade = Facade()
+    facade.prepare_checkout(D(10), 'USD', merchant_invoice_id='100001')
+    assert facade.get_payment_brands('opp_eps') == 'EPS'
+    with pytest.raises(OpenPaymentPlatformError):
+        facade.get_form('/callback/', 'en', payment_method='opp_eps')
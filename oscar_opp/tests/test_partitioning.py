@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from oscar_opp import partitioning
+from oscar_opp.models import Transaction
+
+postgresql = pytest.mark.skipif(
+    not partitioning.is_supported(connection),
+    reason="requires PostgreSQL",
+)
+
+
+def test_partition_name():
+    date = datetime.date(2017, 12, 24)
+    assert partitioning.get_partition_name(date) == \
+        'oscar_opp_transaction_y2017m12'
+
+
+def test_partition_sql_wraps_year():
+    statements = partitioning.get_partition_sql(datetime.date(2017, 12, 24))
+    assert statements[0].startswith(
+        'CREATE TABLE "oscar_opp_transaction_y2017m12"')
+    assert statements[-1].endswith(
+        "FOR VALUES FROM ('2017-12-01') TO ('2018-01-01')")
+
+
+def test_convert_sql_keeps_older_rows():
+    statements = partitioning.get_convert_sql(datetime.date(2017, 12, 24))
+    assert statements[0] == (
+        'ALTER TABLE "oscar_opp_transaction" '
+        'RENAME TO "oscar_opp_transaction_legacy"'
+    )
+    assert statements[-1].endswith(
+        'ATTACH PARTITION "oscar_opp_transaction_legacy" '
+        "FOR VALUES FROM (MINVALUE) TO ('2017-12-01')")
+
+
+@pytest.mark.django_db
+def test_not_partitioned_fallback():
+    if partitioning.is_supported(connection):
+        pytest.skip("fallback is tested on non-PostgreSQL databases")
+    assert not partitioning.convert(connection, datetime.date.today())
+    assert partitioning.create_partitions(
+        connection, datetime.date.today(), 3) == []
+
+
+def create_transaction(checkout_id, date_created=None):
+    transaction = Transaction.objects.create(
+        checkout_id=checkout_id, result_code='000.200.100',
+        raw_request='', raw_response='', response_time=0,
+    )
+    if date_created:
+        Transaction.objects.filter(pk=transaction.pk).update(
+            date_created=date_created)
+    return transaction
+
+
+def count(table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM "%s"' % table)
+        return cursor.fetchone()[0]
+
+
+@postgresql
+@pytest.mark.django_db(transaction=True)
+def test_convert():
+    # converts the test database table, so all checks are in one test
+    now = timezone.now()
+    create_transaction('old', now - datetime.timedelta(days=62))
+    create_transaction('current')
+
+    assert partitioning.convert(connection, now.date(), months=2)
+    assert partitioning.is_partitioned(connection)
+    assert count('oscar_opp_transaction_legacy') == 1
+    assert count(partitioning.get_partition_name(now.date())) == 1
+    assert count(partitioning.get_default_partition_name()) == 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'oscar_opp_transaction_legacy'::regclass "
+            "AND contype = 'p'")
+        assert cursor.fetchall() == [('PRIMARY KEY (id, date_created)',)]
+
+    create_transaction('new')
+    assert Transaction.objects.count() == 3
+    # already created
+    assert partitioning.create_partitions(connection, now.date(), 2) == []
+
+    # a late cron run: rows of a month without partition land in the
+    # default partition and are moved when the partition is created
+    later = partitioning.next_month(
+        partitioning.next_month(now.date()))
+    create_transaction('late', timezone.make_aware(
+        datetime.datetime.combine(later, datetime.time(12))))
+    assert count(partitioning.get_default_partition_name()) == 1
+
+    assert partitioning.create_partitions(connection, later, 1) == [
+        partitioning.get_partition_name(later)]
+    assert count(partitioning.get_default_partition_name()) == 0
+    assert count(partitioning.get_partition_name(later)) == 1
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import threading
+from datetime import timedelta
+from decimal import Decimal as D
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+
+from oscar_opp.copyandpay import prefetch
+from oscar_opp.copyandpay.facade import Facade
+from oscar_opp.models import Transaction
+
+
+@pytest.mark.django_db
+def test_prefetched_checkout_is_reused(mock_gateway):
+    transaction = prefetch.prepare_checkout(D('10.00'), 'EUR', '100001')
+    assert transaction.checkout_id == 'checkout-1'
+
+    facade = Facade()
+    facade.prepare_checkout(D('10.00'), 'EUR', merchant_invoice_id='100001',
+                            reuse=True)
+    assert facade.transaction.pk == transaction.pk
+    assert mock_gateway['get_checkout_id'] == 1
+
+    # handed out, a second tab gets its own checkout
+    facade = Facade()
+    facade.prepare_checkout(D('10.00'), 'EUR', merchant_invoice_id='100001',
+                            reuse=True)
+    assert facade.transaction.checkout_id == 'checkout-2'
+    assert Transaction.objects.get(pk=transaction.pk).handed_out
+
+
+@pytest.mark.django_db
+def test_prefetch_skipped_if_pending_or_paid(mock_gateway):
+    prefetch.prepare_checkout(D('10.00'), 'EUR', '100001')
+    assert prefetch.prepare_checkout(D('10.00'), 'EUR', '100001') is None
+    assert mock_gateway['get_checkout_id'] == 1
+
+    Facade('checkout-1').get_payment_status()
+    Transaction.objects.update(
+        date_created=timezone.now() - timedelta(hours=1))
+    assert prefetch.prepare_checkout(D('10.00'), 'EUR', '100001') is None
+    assert mock_gateway['get_checkout_id'] == 1
+
+
+@pytest.mark.django_db
+def test_expired_or_different_checkout_is_not_reused(mock_gateway):
+    prefetch.prepare_checkout(D('10.00'), 'EUR', '100001')
+
+    facade = Facade()
+    facade.prepare_checkout(D('12.00'), 'EUR', merchant_invoice_id='100001',
+                            reuse=True)
+    assert facade.transaction.checkout_id == 'checkout-2'
+
+    Transaction.objects.update(
+        date_created=timezone.now() - timedelta(hours=1))
+    facade = Facade()
+    facade.prepare_checkout(D('10.00'), 'EUR', merchant_invoice_id='100001',
+                            reuse=True)
+    assert facade.transaction.checkout_id == 'checkout-3'
+
+
+@override_settings(OPP_PREFETCH_CHECKOUTS=False)
+def test_prefetch_disabled():
+    assert prefetch.prefetch_checkout(D('10.00'), 'EUR', '100001') is None
+
+
+@pytest.mark.django_db
+def test_other_payment_type_is_not_reused(mock_gateway):
+    prefetch.prepare_checkout(D('10.00'), 'EUR', '100001')
+
+    facade = Facade()
+    facade.prepare_checkout(D('10.00'), 'EUR', payment_type='PA',
+                            merchant_invoice_id='100001', reuse=True)
+    assert facade.transaction.checkout_id == 'checkout-2'
+    assert facade.transaction.payment_type == 'PA'
+
+    facade = Facade()
+    facade.prepare_checkout(D('10.00'), 'EUR', merchant_invoice_id='100001',
+                            merchant_transaction_id='T1', reuse=True)
+    assert facade.transaction.checkout_id == 'checkout-3'
+    assert mock_gateway['get_checkout_id'] == 3
+
+
+@pytest.mark.django_db
+@override_settings(OPP_PREFETCH_CHECKOUTS=True)
+def test_prefetch_requires_merchant_invoice_id(mock_gateway):
+    assert prefetch.prefetch_checkout(D('10.00'), 'EUR', None) is None
+    assert prefetch.prepare_checkout(D('10.00'), 'EUR', None) is None
+    assert mock_gateway['get_checkout_id'] == 0
+    assert not Transaction.objects.exists()
+
+    Transaction.objects.create(
+        amount=D('10.00'), currency='EUR', payment_type='DB',
+        checkout_id='checkout-0', correlation_id='', result_code='000.200.100',
+        raw_request='', raw_response='', response_time=0,
+    )
+    facade = Facade()
+    facade.prepare_checkout(D('10.00'), 'EUR', reuse=True)
+    assert mock_gateway['get_checkout_id'] == 1
+
+
+@override_settings(OPP_PREFETCH_CHECKOUTS=True, OPP_PREFETCH_WORKERS=1,
+                   OPP_PREFETCH_QUEUE_SIZE=1)
+def test_prefetch_queue_is_bounded(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def prepare_checkout(*args):
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(prefetch, 'prepare_checkout', prepare_checkout)
+    running = prefetch.prefetch_checkout(D('10.00'), 'EUR', '100001')
+    started.wait(5)
+    queued = prefetch.prefetch_checkout(D('10.00'), 'EUR', '100002')
+    assert queued is not None
+    assert prefetch.prefetch_checkout(D('10.00'), 'EUR', '100003') is None
+
+    release.set()
+    running.result(5)
+    queued.result(5)
+    # finished prefetches free their slots
+    assert prefetch.prefetch_checkout(
+        D('10.00'), 'EUR', '100003').result(5) is None
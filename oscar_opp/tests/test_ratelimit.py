@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal as D
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+import requests
+from django.test import RequestFactory, override_settings
+
+from oscar_opp.copyandpay import prefetch
+from oscar_opp.copyandpay.facade import Facade
+from oscar_opp.copyandpay.gateway import Gateway
+from oscar_opp.exceptions import GatewayOverloaded, RateLimitExceeded
+from oscar_opp.ratelimit import (
+    CacheStorage, MemoryStorage, TokenBucket, get_client_keys,
+)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(2, 10)
+    assert bucket.consume('ip:127.0.0.1', now=100)
+    assert bucket.consume('ip:127.0.0.1', now=100)
+    assert not bucket.consume('ip:127.0.0.1', now=100)
+    assert bucket.consume('ip:127.0.0.2', now=100)
+    # refilled with 2 tokens per 10 seconds
+    assert bucket.consume('ip:127.0.0.1', now=105)
+    assert not bucket.consume('ip:127.0.0.1', now=105)
+
+
+def test_token_bucket_all_or_nothing():
+    bucket = TokenBucket(1, 10)
+    assert bucket.consume('basket:1', now=100)
+    assert bucket.consume_all(
+        ['session:abc', 'basket:1'], now=100) == 'basket:1'
+    # not taken from the session bucket
+    assert bucket.consume('session:abc', now=100)
+
+
+def test_memory_storage_drops_least_recently_used():
+    storage = MemoryStorage(max_entries=2)
+    storage.set('a', (1, 100), 10)
+    storage.set('b', (1, 100), 10)
+    storage.get('a')
+    storage.set('c', (1, 100), 10)
+    assert list(storage.buckets) == ['a', 'c']
+
+
+class BrokenCache(object):
+    def get(self, key):
+        raise ConnectionError()
+
+    def set(self, key, value, timeout):
+        raise ConnectionError()
+
+
+def test_token_bucket_cache_fallback():
+    bucket = TokenBucket(1, 10, storage=CacheStorage(BrokenCache()))
+    assert bucket.consume('session:abc', now=100)
+    assert not bucket.consume('session:abc', now=100)
+
+
+def test_client_keys():
+    request = RequestFactory().get(
+        '/', REMOTE_ADDR='10.0.0.1',
+        HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.7',
+    )
+    # behind a proxy REMOTE_ADDR is the proxy, so no IP key by default
+    assert get_client_keys(request) == []
+    with override_settings(OPP_RATE_LIMIT_IP_HEADER='REMOTE_ADDR'):
+        assert get_client_keys(request) == ['ip:10.0.0.1']
+    with override_settings(OPP_RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR'):
+        # the address added by the proxy, not the one sent by the client
+        assert get_client_keys(request) == ['ip:203.0.113.7']
+
+
+class SlowCache(object):
+    def __init__(self):
+        self.data = {}
+        self.blocked = threading.Event()
+        self.release = threading.Event()
+
+    def get(self, key):
+        if key.endswith('session:slow'):
+            self.blocked.set()
+            self.release.wait(5)
+        return self.data.get(key)
+
+    def set(self, key, value, timeout):
+        self.data[key] = value
+
+
+def test_token_bucket_cache_not_serialized():
+    cache = SlowCache()
+    bucket = TokenBucket(1, 10, storage=CacheStorage(cache))
+    slow = threading.Thread(target=bucket.consume, args=['session:slow'])
+    slow.start()
+    try:
+        assert cache.blocked.wait(5)
+        # not waiting for the slow cache round trip of another client
+        assert bucket.consume('session:fast')
+        assert slow.is_alive()
+    finally:
+        cache.release.set()
+        slow.join(5)
+
+
+@pytest.mark.django_db
+@override_settings(OPP_RATE_LIMIT=(2, 60), OPP_RATE_LIMIT_CACHE=None)
+def test_rate_limit_before_gateway_call(mock_gateway):
+    for __ in range(2):
+        Facade().prepare_checkout(
+            D(10), 'EUR', merchant_invoice_id='100001',
+            rate_limit_keys=['ip:127.0.0.1'],
+        )
+    with pytest.raises(RateLimitExceeded):
+        Facade().prepare_checkout(
+            D(10), 'EUR', merchant_invoice_id='100001',
+            rate_limit_keys=['ip:127.0.0.1'],
+        )
+    assert mock_gateway['get_checkout_id'] == 2
+
+
+@pytest.mark.django_db
+@override_settings(OPP_RATE_LIMIT=(1, 60), OPP_RATE_LIMIT_CACHE=None)
+def test_prefetch_only_limited_on_gateway_call(mock_gateway):
+    keys = ['ip:127.0.0.1']
+    assert prefetch.prepare_checkout(
+        D(10), 'EUR', '100001', rate_limit_keys=keys)
+    # pending checkout, no gateway call and no token taken
+    assert prefetch.prepare_checkout(
+        D(10), 'EUR', '100001', rate_limit_keys=keys) is None
+    # gateway call, rate limited and skipped
+    assert prefetch.prepare_checkout(
+        D(12), 'EUR', '100001', rate_limit_keys=keys) is None
+    assert mock_gateway['get_checkout_id'] == 1
+
+
+class SlowGatewayHandler(BaseHTTPRequestHandler):
+    latency = 0.3
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        time.sleep(self.latency)
+        with cls.lock:
+            cls.active -= 1
+        body = json.dumps({
+            'id': 'checkout',
+            'result': {'code': '000.200.100', 'description': ''},
+        }).encode('utf-8')
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_gateway():
+    class Server(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    server = Server(('127.0.0.1', 0), SlowGatewayHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield Gateway(
+        'http://127.0.0.1:%s/v1/' % server.server_port,
+        'user', 'password', 'entity',
+    )
+    server.shutdown()
+    server.server_close()
+
+
+@override_settings(OPP_MAX_CONCURRENT_REQUESTS=2)
+def test_concurrency_cap_sheds_load(slow_gateway):
+    def call():
+        try:
+            return slow_gateway.get_checkout_id(
+                amount=D(10), currency='EUR', payment_type='DB',
+            ).status_code
+        except GatewayOverloaded:
+            return 'shed'
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda __: call(), range(8)))
+
+    assert results.count(200) >= 2
+    assert 'shed' in results
+    assert SlowGatewayHandler.max_active <= 2
+
+
+@override_settings(OPP_MAX_CONCURRENT_REQUESTS=1)
+def test_timeout_releases_slot(slow_gateway):
+    slow_gateway.timeout = 0.05
+    for __ in range(2):
+        with pytest.raises(requests.Timeout):
+            slow_gateway.get_checkout_id(
+                amount=D(10), currency='EUR', payment_type='DB',
+            )
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from oscar_opp.copyandpay.responses import (
+    CheckoutResponse, PaymentStatusResponse,
+)
+
+
+def test_checkout_response():
+    content = json.dumps({
+        'id': '2E04FECDB36CC98BA8C79B4AC348BA59.sbg-vm-tx02',
+        'result': {
+            'code': '000.200.100',
+            'description': 'successfully created checkout',
+        },
+        'buildNumber': '1.2.3',
+    }).encode('utf-8')
+    response = CheckoutResponse(200, content, raw_request='amount=10.00')
+    assert response.ok
+    assert response.checkout_id == \
+        '2E04FECDB36CC98BA8C79B4AC348BA59.sbg-vm-tx02'
+    assert response.result_code == '000.200.100'
+    assert response.result_description == 'successfully created checkout'
+    assert response.raw_response == content.decode('utf-8')
+    assert response.raw_request == 'amount=10.00'
+
+
+def test_payment_status_response():
+    content = json.dumps({
+        'id': '8a82944a4cc25ebf014cc2c782423202',
+        'paymentType': 'DB',
+        'paymentBrand': 'VISA',
+        'result': {'code': '000.100.110', 'description': 'test mode'},
+        'threeDSecure': {'eci': '05'},
+        'risk': {'score': '0'},
+    })
+    response = PaymentStatusResponse(200, content, raw_request=None)
+    assert response.entity_id == '8a82944a4cc25ebf014cc2c782423202'
+    assert response.payment_brand == 'VISA'
+    assert response.payment_type == 'DB'
+    assert response.result_code == '000.100.110'
+    assert response.raw_request == ''
+    with pytest.raises(AttributeError):
+        response.risk = {}
+
+
+def test_error_response_is_not_parsed():
+    response = PaymentStatusResponse(502, b'<html>Bad Gateway</html>')
+    assert not response.ok
+    assert response.entity_id is None
+    assert response.payment_brand is None
+    assert response.raw_response == '<html>Bad Gateway</html>'
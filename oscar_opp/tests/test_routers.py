@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import pytest
+from django.conf import settings
+from django.test import override_settings
+
+from oscar_opp.copyandpay.facade import Facade
+from oscar_opp.exceptions import OpenPaymentPlatformError
+from oscar_opp.models import Transaction
+from oscar_opp.routers import ReplicaRouter
+
+two_databases = pytest.mark.skipif(
+    'replica' not in settings.DATABASES,
+    reason="requires a second database aliased 'replica'",
+)
+
+
+@override_settings(OPP_REPLICA_DATABASES=['replica'])
+def test_router():
+    router = ReplicaRouter()
+    assert router.db_for_read(Transaction) == 'replica'
+    assert router.db_for_write(Transaction) == 'default'
+
+
+@override_settings(OPP_REPLICA_DATABASES=[])
+def test_router_without_replicas():
+    assert ReplicaRouter().db_for_read(Transaction) == 'default'
+
+
+@override_settings(OPP_REPLICA_DATABASES=['replica'])
+def test_queryset_alias():
+    assert Transaction.objects.primary().db == 'default'
+    assert Transaction.objects.replica().db == 'replica'
+
+
+def create_transaction(using, checkout_id, **kwargs):
+    kwargs.setdefault('result_code', '000.200.100')
+    return Transaction.objects.using(using).create(
+        checkout_id=checkout_id,
+        raw_request='', raw_response='', response_time=0,
+        **kwargs
+    )
+
+
+@two_databases
+@pytest.mark.django_db(databases=['default', 'replica'])
+@override_settings(
+    OPP_REPLICA_DATABASES=['replica'],
+    DATABASE_ROUTERS=['oscar_opp.routers.ReplicaRouter'],
+)
+def test_facade_reads_own_writes():
+    # not replicated yet
+    create_transaction('default', 'checkout-1')
+    facade = Facade('checkout-1')
+    assert facade.transaction._state.db == 'default'
+    facade._update_transaction(result_code='000.100.110', commit=True)
+    assert not Transaction.objects.using('replica').exists()
+
+    with pytest.raises(Transaction.DoesNotExist):
+        Facade('checkout-1', read_only=True)
+
+
+@two_databases
+@pytest.mark.django_db(databases=['default', 'replica'])
+@override_settings(
+    OPP_REPLICA_DATABASES=['replica'],
+    DATABASE_ROUTERS=['oscar_opp.routers.ReplicaRouter'],
+)
+def test_facade_read_only():
+    create_transaction(
+        'replica', 'checkout-2',
+        entity_id='8a829417554f038201554f4c4af304f5',
+        result_code='000.100.110',
+    )
+    assert Transaction.objects.terminal().count() == 1
+    assert Transaction.objects.primary().terminal().count() == 0
+
+    facade = Facade('checkout-2', read_only=True)
+    assert facade.transaction.is_approved
+    with pytest.raises(OpenPaymentPlatformError):
+        facade.get_payment_status()
+    with pytest.raises(OpenPaymentPlatformError):
+        facade._update_transaction(result_code='', commit=True)
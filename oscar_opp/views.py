@@ -2,5 +2,33 @@
 from __future__ import unicode_literals
 
 
+from .copyandpay.prefetch import prefetch_checkout
+from .ratelimit import get_client_keys
+
+
 class OPPViewMixin(object):
-    pass
+    def get_rate_limit_keys(self, basket=None):
+        """
+        Return the rate limit keys of the current client.
+
+        Pass them as `rate_limit_keys` to `Facade.prepare_checkout`.
+        """
+        return get_client_keys(self.request, basket)
+
+    def prefetch_checkout(self, total, merchant_invoice_id):
+        """
+        Prepare the checkout for an order total in the background.
+
+        Call as soon as the total is known, eg. in the preview step, so the
+        payment form does not wait for OPP. The client's rate limit is only
+        checked if OPP is called; a rate limited prefetch is skipped and
+        the payment page prepares the checkout itself.
+
+        :param total: oscar Price of the basket/order total
+        :param merchant_invoice_id: eg. the order number
+        """
+        return prefetch_checkout(
+            total.incl_tax, total.currency,
+            merchant_invoice_id=merchant_invoice_id,
+            rate_limit_keys=self.get_rate_limit_keys(),
+        )
@@ -30,6 +30,10 @@ setup(
         'requests >= 2.12.1',
         'opp',
     ],
+    extras_require={
+        # faster parsing of gateway responses
+        'orjson': ['orjson'],
+    },
     classifiers=[
         'Development Status :: 4 - Beta',
         'Intended Audience :: Developers',